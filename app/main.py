@@ -1,28 +1,41 @@
 """Main entrypoint for the FastAPI application."""
+from contextlib import asynccontextmanager
+import anyio.to_thread
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from .utils.env_loader import load_env
+from .utils.static_files import CachedStaticFiles
 from .routes import router
+from .services import http
 import os
 
-# Load environment variables from .env file
-load_env()
+# --- Lifespan ---
+# A single AsyncClient is shared by all services so connections are pooled.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # StaticFiles does its file I/O on AnyIO's thread pool (40 threads by default).
+    anyio.to_thread.current_default_thread_limiter().total_tokens = 64
+    await http.startup()
+    try:
+        yield
+    finally:
+        await http.shutdown()
 
 # Create FastAPI app instance
 app = FastAPI(
     title="AI Podcast Generator",
     description="An API to generate podcasts from text using AI.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # --- Mount Static Files ---
 # This allows serving files from the 'files' directory at the /files endpoint.
-# Note: The GET /files/{filename} route in routes.py provides a more controlled way to do this.
-# If you prefer only using the route, you can comment out the next line.
-# However, mounting is efficient for serving static content.
+# StaticFiles sends files with sendfile() where available and handles HEAD,
+# range requests and ETag/If-None-Match validation out of the box.
+# CachedStaticFiles adds a Cache-Control header and serves `<file>.b64`
+# as the Base64 encoding of `<file>`, computed once and kept on disk.
 files_dir = "files"
 os.makedirs(files_dir, exist_ok=True)
-app.mount("/files", StaticFiles(directory=files_dir), name="files")
+app.mount("/files", CachedStaticFiles(directory=files_dir), name="files")
 
 
 # --- Include API Routes ---
@@ -40,5 +53,11 @@ async def root():
         "docs_url": "/docs"
     }
 
-# To run this app:
+# To run this app in development:
 # uvicorn app.main:app --reload
+#
+# In production, use several Uvicorn workers (uvloop and httptools are used
+# automatically when installed):
+# gunicorn app.main:app -c gunicorn_conf.py
+# Each worker keeps its own HTTP connection pool;
+# TTS_CONCURRENCY applies per worker, so the total is workers x limit.
@@ -1,19 +1,24 @@
 """API routes for the Podcast Generator."""
 import os
+import io
+import asyncio
 import uuid
-import base64
 import re
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import FileResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
+from .schemas import ScriptLine, ScriptResponse
+from .settings import get_settings
+from .utils.base64_files import encode_file_base64
 from .services import gemini, elevenlabs, audio
 
 # Define router
 router = APIRouter()
 
 # --- Helper Function ---
+_SANITIZE_RE = re.compile(r'[^\w\-]', re.UNICODE)
+
 def sanitize_filename(title: str) -> str:
     """
     Sanitizes a string to be used as a valid filename.
@@ -21,9 +26,7 @@ def sanitize_filename(title: str) -> str:
     alphanumeric, underscores, or hyphens.
     Limits the length to 200 characters to avoid issues with file systems.
     """
-    s = title.strip().replace(' ', '_')
-    s = re.sub(r'(?u)[^\w\-\_]', '', s)
-    return s[:200]
+    return _SANITIZE_RE.sub('', title.strip().replace(' ', '_'))[:200]
 
 # --- Pydantic Models for Request/Response ---
 
@@ -41,20 +44,12 @@ class PresenterFull(BaseModel):
     voice_id: str = Field(..., description="ElevenLabs voice ID for this presenter.")
     personality: str = Field(..., description="A brief description of the presenter's personality.")
 
-class ScriptLine(BaseModel):
-    speaker: str
-    line: str
-
 # Models for the new endpoints
 class ScriptRequest(BaseModel):
     transcription: str = Field(..., description="The full text transcription to be converted into a podcast script.")
     style: str = Field("Conversacional", description="Style of the podcast (e.g., 'Educativo', 'Humorístico').")
     presenters: List[PresenterForScript] = Field(..., min_items=2, max_items=2, description="A list of exactly two presenters with their names and personalities.")
 
-class ScriptResponse(BaseModel):
-    title: str
-    script: List[ScriptLine]
-
 class AudioFromScriptRequest(BaseModel):
     title: str = Field(..., description="Title of the podcast.")
     script: List[ScriptLine] = Field(..., description="The script to be converted to audio.")
@@ -93,8 +88,10 @@ async def health_check():
     """
     A detailed health check endpoint that verifies the service and its dependencies.
     """
-    gemini_status = gemini.check_gemini_api()
-    elevenlabs_status = elevenlabs.check_elevenlabs_api()
+    gemini_status, elevenlabs_status = await asyncio.gather(
+        gemini.check_gemini_api(),
+        elevenlabs.check_elevenlabs_api()
+    )
 
     overall_status = "ok" if gemini_status["status"] == "ok" and elevenlabs_status["status"] == "ok" else "error"
 
@@ -108,7 +105,25 @@ async def health_check():
 
 # --- Helper Function for Audio Generation ---
 
-def _generate_audio_and_get_response(
+def _merge_consecutive_lines(pairs: List[Tuple[str, str]], max_chars: int) -> List[Tuple[str, str]]:
+    """
+    Joins adjacent (speaker, line) pairs by the same speaker so each run needs
+    a single TTS call. A merged line never grows past max_chars; a single
+    line longer than that is left as is.
+    """
+    merged = []
+    for speaker, text in pairs:
+        if (
+            merged
+            and merged[-1][0] == speaker
+            and len(merged[-1][1]) + 1 + len(text) <= max_chars
+        ):
+            merged[-1] = (speaker, f"{merged[-1][1]} {text}")
+        else:
+            merged.append((speaker, text))
+    return merged
+
+async def _generate_audio_and_get_response(
     title: str,
     script: List[ScriptLine],
     presenters: List[PresenterForAudio],
@@ -120,37 +135,40 @@ def _generate_audio_and_get_response(
     and returning the appropriate response (URL or Base64).
     """
     voice_map = {p.name: p.voice_id for p in presenters}
-    audio_chunks_paths = []
+    buffers = []
+    tasks = []
     podcast_id = str(uuid.uuid4())
 
-    for i, line in enumerate(script):
-        speaker_name = line.speaker
-        dialogue = line.line
-        
+    # Read each model attribute once up front instead of inside the loop.
+    pairs = _merge_consecutive_lines(
+        [(line.speaker, line.line) for line in script],
+        get_settings().TTS_MERGE_MAX_CHARS
+    )
+
+    for speaker_name, dialogue in pairs:
         voice_id = voice_map.get(speaker_name)
         if not voice_id:
             print(f"Warning: Speaker '{speaker_name}' not found in presenters list. Skipping line.")
             continue
 
-        chunk_path = os.path.join(FILES_DIR, f"{podcast_id}_chunk_{i}.mp3")
-        elevenlabs.generate_audio_for_line(dialogue, voice_id, chunk_path)
-        audio_chunks_paths.append(chunk_path)
+        buffer = io.BytesIO()
+        tasks.append(elevenlabs.generate_audio_for_line(dialogue, voice_id, buffer))
+        buffers.append(buffer)
+
+    # All lines are synthesized concurrently into their own buffer; the
+    # buffers are then written to the final file in script order.
+    await asyncio.gather(*tasks)
 
     sanitized_title = sanitize_filename(title)
     final_audio_filename = f"{sanitized_title}_{podcast_id}.mp3"
     final_audio_path = os.path.join(FILES_DIR, final_audio_filename)
     
-    try:
-        audio.combine_audio_files(audio_chunks_paths, final_audio_path)
-    finally:
-        audio.cleanup_files(audio_chunks_paths)
+    await audio.combine_audio_buffers(buffers, final_audio_path)
 
     response_data = {"status": "success"}
     if return_base64:
         try:
-            with open(final_audio_path, "rb") as audio_file:
-                encoded_string = base64.b64encode(audio_file.read()).decode('utf-8')
-            response_data["audio_base64"] = encoded_string
+            response_data["audio_base64"] = await asyncio.to_thread(encode_file_base64, final_audio_path)
         finally:
             audio.cleanup_files([final_audio_path])
     else:
@@ -161,15 +179,17 @@ def _generate_audio_and_get_response(
 # --- NEW ENDPOINTS ---
 
 @router.post("/generate-script", response_model=ScriptResponse, summary="1. Generate Script from Transcription")
-async def generate_script_only(request_data: ScriptRequest):
+async def generate_script_only(request_data: ScriptRequest, no_cache: bool = False):
     """
     Receives a transcription and returns a structured JSON script without generating audio.
+    Pass `?no_cache=true` to force a fresh script from Gemini.
     """
     try:
-        script_data = gemini.generate_script(
+        script_data = await gemini.generate_script(
             transcription=request_data.transcription,
             style=request_data.style,
-            presenters=[p.dict() for p in request_data.presenters]
+            presenters=[p.model_dump() for p in request_data.presenters],
+            use_cache=not no_cache
         )
         return script_data
     except HTTPException as e:
@@ -183,7 +203,7 @@ async def generate_audio_from_script(request_data: AudioFromScriptRequest, reque
     Receives a structured JSON script and generates the final audio file.
     """
     try:
-        response = _generate_audio_and_get_response(
+        response = await _generate_audio_and_get_response(
             title=request_data.title,
             script=request_data.script,
             presenters=request_data.presenters,
@@ -200,24 +220,24 @@ async def generate_audio_from_script(request_data: AudioFromScriptRequest, reque
 # --- ORIGINAL ALL-IN-ONE ENDPOINT ---
 
 @router.post("/generate-podcast", response_model=PodcastResponse, summary="Generate Full Podcast (All-in-One)")
-async def generate_podcast(request_data: PodcastRequest, request: Request):
+async def generate_podcast(request_data: PodcastRequest, request: Request, no_cache: bool = False):
     """
     Main endpoint to generate a podcast from start to finish.
+    Pass `?no_cache=true` to force a fresh script from Gemini.
     """
     try:
         # 1. Generate script
-        script_data = gemini.generate_script(
+        script_data = await gemini.generate_script(
             transcription=request_data.transcription,
             style=request_data.style,
-            presenters=[p.dict() for p in request_data.presenters]
+            presenters=[p.model_dump() for p in request_data.presenters],
+            use_cache=not no_cache
         )
-        title = script_data["title"]
-        
-        # Convert script from list of dicts to list of ScriptLine objects
-        script_objects = [ScriptLine(**line) for line in script_data["script"]]
+        title = script_data.title
+        script_objects = script_data.script
 
         # 2. Generate audio using the helper function
-        audio_response = _generate_audio_and_get_response(
+        audio_response = await _generate_audio_and_get_response(
             title=title,
             script=script_objects,
             presenters=request_data.presenters,
@@ -241,14 +261,3 @@ async def generate_podcast(request_data: PodcastRequest, request: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
-
-@router.get("/files/{filename}", summary="Serve Generated Audio Files")
-async def get_file(filename: str):
-    """
-    Serves a generated audio file from the 'files' directory.
-    """
-    file_path = os.path.join(FILES_DIR, filename)
-    if os.path.exists(file_path):
-        return FileResponse(file_path, media_type="audio/mpeg", filename=filename)
-    else:
-        raise HTTPException(status_code=404, detail="File not found.")
\ No newline at end of file
@@ -0,0 +1,11 @@
+"""Pydantic models shared between the routes and the services."""
+from pydantic import BaseModel
+from typing import List
+
+class ScriptLine(BaseModel):
+    speaker: str
+    line: str
+
+class ScriptResponse(BaseModel):
+    title: str
+    script: List[ScriptLine]
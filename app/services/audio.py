@@ -1,33 +1,57 @@
-"""Service for audio manipulation using pydub."""
+"""Service for combining and cleaning up generated MP3 audio."""
+import io
 import os
-from pydub import AudioSegment
+import aiofiles
 from fastapi import HTTPException
 
-def combine_audio_files(file_paths: list[str], output_path: str):
+def _id3v2_size(header: bytes) -> int:
     """
-    Combines multiple MP3 files into a single file.
+    Returns the total size in bytes of a leading ID3v2 tag, or 0 if there is none.
 
     Args:
-        file_paths: A list of paths to the MP3 files to combine.
+        header: At least the first 10 bytes of an MP3 file.
+    """
+    if len(header) < 10 or not header.startswith(b"ID3"):
+        return 0
+    # The tag size is a 28-bit "syncsafe" integer (7 bits per byte) that
+    # excludes the 10-byte header itself.
+    size = (
+        ((header[6] & 0x7f) << 21)
+        | ((header[7] & 0x7f) << 14)
+        | ((header[8] & 0x7f) << 7)
+        | (header[9] & 0x7f)
+    )
+    # Bit 4 of the flags byte signals a 10-byte footer.
+    if header[5] & 0x10:
+        size += 10
+    return size + 10
+
+async def combine_audio_buffers(buffers: list[io.BytesIO], output_path: str):
+    """
+    Writes in-memory MP3 chunks, in order, into a single file.
+
+    The ElevenLabs chunks share codec and sample rate, so MP3 frames are
+    concatenated as-is without decoding; ID3v2 tags are kept only for the
+    first chunk. The data is written to a temporary file that is renamed
+    into place once complete, so a partially written podcast is never served.
+
+    Args:
+        buffers: A list of buffers holding MP3 data, in playback order.
         output_path: The path to save the final combined MP3 file.
-    
+
     Raises:
-        HTTPException: If an error occurs during audio processing.
+        HTTPException: If the output file cannot be written.
     """
+    partial_path = f"{output_path}.part"
     try:
-        combined_audio = AudioSegment.empty()
-        for path in file_paths:
-            if os.path.exists(path):
-                segment = AudioSegment.from_mp3(path)
-                combined_audio += segment
-            else:
-                # This can be a warning or an error depending on desired strictness
-                print(f"Warning: Audio file not found at {path}, skipping.")
-
-        # Export the combined audio file
-        combined_audio.export(output_path, format="mp3")
-    except Exception as e:
-        # Catching a broad exception as pydub can raise various errors
+        async with aiofiles.open(partial_path, "wb") as out:
+            for i, buffer in enumerate(buffers):
+                with buffer.getbuffer() as data:
+                    offset = _id3v2_size(bytes(data[:10])) if i > 0 else 0
+                    await out.write(data[offset:])
+        os.replace(partial_path, output_path)
+    except OSError as e:
+        cleanup_files([partial_path])
         raise HTTPException(status_code=500, detail=f"Failed to combine audio files: {e}")
 
 def cleanup_files(file_paths: list[str]):
@@ -39,8 +63,9 @@ def cleanup_files(file_paths: list[str]):
     """
     for path in file_paths:
         try:
-            if os.path.exists(path):
-                os.remove(path)
+            os.remove(path)
+        except FileNotFoundError:
+            pass
         except OSError as e:
             # Log the error but don't interrupt the response to the user
             print(f"Error cleaning up file {path}: {e}")
@@ -1,65 +1,114 @@
 """Service for interacting with the ElevenLabs API."""
-import os
-import requests
+import asyncio
+import hashlib
+import diskcache
+from typing import BinaryIO, Optional
+import httpx
 from fastapi import HTTPException
 
-ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
+from ..settings import get_settings
+from .http import get_client
+
 ELEVENLABS_API_URL_BASE = "https://api.elevenlabs.io/v1"
+VOICE_STABILITY = 0.5
+VOICE_SIMILARITY_BOOST = 0.75
+
+# Generated MP3 bytes keyed by everything that affects the audio, so
+# recurring lines ("Bienvenidos", intros...) skip the API entirely.
+# The cache is opened on first use so importing the app doesn't create it.
+TTS_CACHE_TTL = 86400 * 30
+_tts_cache: Optional[diskcache.Cache] = None
+
+def _get_tts_cache() -> diskcache.Cache:
+    global _tts_cache
+    if _tts_cache is None:
+        _tts_cache = diskcache.Cache("./.tts_cache", size_limit=5 << 30)
+    return _tts_cache
+
+def _tts_cache_key(line: str, voice_id: str, model_id: str) -> str:
+    return hashlib.sha256(
+        f"{voice_id}|{model_id}|{VOICE_STABILITY}|{VOICE_SIMILARITY_BOOST}|{line}".encode()
+    ).hexdigest()
+
+# Caps the number of in-flight TTS requests across all podcasts in this
+# process to stay within ElevenLabs' concurrency limits. The limit is per
+# worker, so the deployment total is workers x TTS_CONCURRENCY. Created on
+# first use so the limit comes from the loaded settings.
+_tts_semaphore: Optional[asyncio.Semaphore] = None
 
-def generate_audio_for_line(line: str, voice_id: str, output_path: str):
+def _get_tts_semaphore() -> asyncio.Semaphore:
+    global _tts_semaphore
+    if _tts_semaphore is None:
+        _tts_semaphore = asyncio.Semaphore(get_settings().TTS_CONCURRENCY)
+    return _tts_semaphore
+
+async def generate_audio_for_line(line: str, voice_id: str, output: BinaryIO):
     """
     Generates audio for a single line of text using ElevenLabs API.
 
     Args:
         line: The text to convert to speech.
         voice_id: The ID of the ElevenLabs voice to use.
-        output_path: The path to save the generated MP3 file.
+        output: A writable binary sink that receives the generated MP3 bytes.
 
     Raises:
         HTTPException: If the API key is missing or the API call fails.
     """
-    if not ELEVENLABS_API_KEY:
+    settings = get_settings()
+    if not settings.ELEVENLABS_API_KEY:
         raise HTTPException(status_code=500, detail="ELEVENLABS_API_KEY is not set.")
 
+    key = _tts_cache_key(line, voice_id, settings.ELEVENLABS_MODEL_ID)
+    # diskcache does blocking SQLite and file I/O, so it runs off the event loop.
+    cached = await asyncio.to_thread(_get_tts_cache().get, key)
+    if cached is not None:
+        output.write(cached)
+        return
+
     headers = {
         "Accept": "audio/mpeg",
         "Content-Type": "application/json",
-        "xi-api-key": ELEVENLABS_API_KEY
+        "xi-api-key": settings.ELEVENLABS_API_KEY
     }
     data = {
         "text": line,
-        "model_id": os.getenv("ELEVENLABS_MODEL_ID", "eleven_multilingual_v2"),
+        "model_id": settings.ELEVENLABS_MODEL_ID,
         "voice_settings": {
-            "stability": 0.5,
-            "similarity_boost": 0.75
+            "stability": VOICE_STABILITY,
+            "similarity_boost": VOICE_SIMILARITY_BOOST
         }
     }
 
     try:
         url = f"{ELEVENLABS_API_URL_BASE}/text-to-speech/{voice_id}"
-        response = requests.post(url, headers=headers, json=data, timeout=60)
-        response.raise_for_status()
+        async with _get_tts_semaphore():
+            async with get_client().stream("POST", url, headers=headers, json=data, timeout=60) as response:
+                response.raise_for_status()
+
+                audio_data = bytearray()
+                async for chunk in response.aiter_bytes(65536):
+                    audio_data += chunk
+                    output.write(chunk)
 
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=1024):
-                if chunk:
-                    f.write(chunk)
+        # Only complete responses are cached.
+        await asyncio.to_thread(_get_tts_cache().set, key, bytes(audio_data), expire=TTS_CACHE_TTL)
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Error calling ElevenLabs API: {e}")
 
-def check_elevenlabs_api():
+async def check_elevenlabs_api():
     """
     Checks if the ElevenLabs API is available.
     """
-    if not ELEVENLABS_API_KEY:
+    settings = get_settings()
+    if not settings.ELEVENLABS_API_KEY:
         return {"status": "error", "message": "ELEVENLABS_API_KEY is not set."}
 
-    headers = {"xi-api-key": ELEVENLABS_API_KEY}
+    headers = {"xi-api-key": settings.ELEVENLABS_API_KEY}
     try:
         url = f"{ELEVENLABS_API_URL_BASE}/voices"
-        response = requests.get(url, headers=headers, timeout=10)
+        response = await get_client().get(url, headers=headers, timeout=10)
         response.raise_for_status()
         return {"status": "ok"}
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return {"status": "error", "message": str(e)}
@@ -1,34 +1,27 @@
 """Service for interacting with the Google Gemini API."""
-import os
-import requests
-import json
+import asyncio
+import orjson
+import hashlib
+import diskcache
+import httpx
+from typing import Optional
 from fastapi import HTTPException
+from pydantic import ValidationError
+
+from ..schemas import ScriptResponse
+from ..settings import get_settings
+from .http import get_client
 
-# It's better to get the key here where it's used.
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_API_URL_BASE = "https://generativelanguage.googleapis.com/v1beta"
+GEMINI_MODEL = "models/gemini-1.5-flash"
 
-def generate_script(transcription: str, style: str, presenters: list[dict]) -> dict:
+def _build_prompt(transcription: str, style: str, presenters: list[dict]) -> str:
     """
-    Generates a conversational script using the Gemini API.
-
-    Args:
-        transcription: The source text to base the script on.
-        style: The desired style of the podcast (e.g., "Educativo").
-        presenters: A list of presenters with their names.
-
-    Returns:
-        A dictionary containing the title and the script.
-    
-    Raises:
-        HTTPException: If the API key is missing or the API call fails.
+    Builds the prompt that turns a transcription into a podcast script.
     """
-    if not GEMINI_API_KEY:
-        raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not set.")
-
     presenter_names = " y ".join([p["name"] for p in presenters])
     
-    prompt = f"""
+    return f"""
     Actúa como un guionista experto de podcasts.
     Tu tarea es transformar la siguiente transcripción en un guion conversacional y dinámico para un podcast.
     El guion debe ser para dos presentadores: {presenter_names}.
@@ -59,16 +52,60 @@ def generate_script(transcription: str, style: str, presenters: list[dict]) -> d
     ---
     """
 
+# Parsed scripts keyed by a hash of the request inputs, so repeated
+# transcriptions don't hit the API again.
+# The cache is opened on first use so importing the app doesn't create it.
+SCRIPT_CACHE_TTL = 86400 * 7
+_script_cache: Optional[diskcache.Cache] = None
+
+def _get_script_cache() -> diskcache.Cache:
+    global _script_cache
+    if _script_cache is None:
+        _script_cache = diskcache.Cache("./.gemini_cache", size_limit=2 << 30)
+    return _script_cache
+
+def _script_cache_key(transcription: str, style: str, presenters: list[dict]) -> str:
+    # JSON-encoding keeps field boundaries unambiguous, whatever the values contain.
+    names = [p["name"] for p in presenters]
+    return hashlib.sha256(orjson.dumps([style, names, transcription])).hexdigest()
+
+async def generate_script(transcription: str, style: str, presenters: list[dict], use_cache: bool = True) -> ScriptResponse:
+    """
+    Generates a conversational script using the Gemini API.
+
+    Args:
+        transcription: The source text to base the script on.
+        style: The desired style of the podcast (e.g., "Educativo").
+        presenters: A list of presenters with their names.
+        use_cache: If false, skips the cache lookup. The result is still cached.
+
+    Returns:
+        The validated title and script.
+    
+    Raises:
+        HTTPException: If the API key is missing or the API call fails.
+    """
+    settings = get_settings()
+    if not settings.GEMINI_API_KEY:
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not set.")
+
+    key = _script_cache_key(transcription, style, presenters)
+    if use_cache:
+        # diskcache does blocking SQLite and file I/O, so it runs off the event loop.
+        cached = await asyncio.to_thread(_get_script_cache().get, key)
+        if cached is not None:
+            return ScriptResponse.model_validate(cached)
+
     headers = {
         "Content-Type": "application/json",
     }
     params = {
-        "key": GEMINI_API_KEY
+        "key": settings.GEMINI_API_KEY
     }
     data = {
         "contents": [{
             "parts": [{
-                "text": prompt
+                "text": _build_prompt(transcription, style, presenters)
             }]
         }],
         "generationConfig": {
@@ -77,36 +114,40 @@ def generate_script(transcription: str, style: str, presenters: list[dict]) -> d
     }
 
     try:
-        url = f"{GEMINI_API_URL_BASE}/models/gemini-1.5-flash:generateContent"
-        response = requests.post(url, headers=headers, params=params, json=data, timeout=120)
+        url = f"{GEMINI_API_URL_BASE}/{GEMINI_MODEL}:generateContent"
+        response = await get_client().post(url, headers=headers, params=params, content=orjson.dumps(data), timeout=120)
         response.raise_for_status()
         
-        # The response from Gemini should be a JSON string, which needs to be parsed.
-        response_text = response.json()['candidates'][0]['content']['parts'][0]['text']
-        response_data = json.loads(response_text)
-        
-        if not isinstance(response_data, dict) or "title" not in response_data or "script" not in response_data:
-            raise ValueError("La respuesta de Gemini no tiene el formato esperado de {{'title': ..., 'script': ...}}.")
+        # The envelope is parsed straight from the raw bytes; the candidate
+        # text is already the JSON script because of response_mime_type.
+        outer = orjson.loads(response.content)
+        response_text = outer['candidates'][0]['content']['parts'][0]['text']
+        # Parses and validates in one pass, so malformed script lines are
+        # rejected here instead of failing later in the TTS step.
+        script = ScriptResponse.model_validate_json(response_text)
 
-        return response_data
+        # Stored as a plain dict so cache entries don't depend on the model class.
+        await asyncio.to_thread(_get_script_cache().set, key, script.model_dump(), expire=SCRIPT_CACHE_TTL)
+        return script
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Error calling Gemini API: {e}")
-    except (json.JSONDecodeError, KeyError, ValueError) as e:
+    except (orjson.JSONDecodeError, ValidationError, KeyError, IndexError, TypeError, ValueError) as e:
         raise HTTPException(status_code=500, detail=f"Error processing Gemini response: {e}. Response text: {response.text}")
 
-def check_gemini_api():
+async def check_gemini_api():
     """
     Checks if the Gemini API is available.
     """
-    if not GEMINI_API_KEY:
+    settings = get_settings()
+    if not settings.GEMINI_API_KEY:
         return {"status": "error", "message": "GEMINI_API_KEY is not set."}
 
-    params = {"key": GEMINI_API_KEY}
+    params = {"key": settings.GEMINI_API_KEY}
     try:
         url = f"{GEMINI_API_URL_BASE}/models"
-        response = requests.get(url, params=params, timeout=10)
+        response = await get_client().get(url, params=params, timeout=10)
         response.raise_for_status()
         return {"status": "ok"}
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return {"status": "error", "message": str(e)}
@@ -0,0 +1,44 @@
+"""Shared HTTP client for calls to external APIs."""
+from typing import Optional
+
+import httpx
+
+_client: Optional[httpx.AsyncClient] = None
+
+async def startup():
+    """
+    Creates the shared AsyncClient. Called when the app starts.
+    """
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=120,
+            http2=True,
+            # Keep every pooled connection alive between requests so TTS
+            # bursts and Gemini calls skip repeated TCP/TLS handshakes.
+            limits=httpx.Limits(
+                max_connections=32,
+                max_keepalive_connections=32,
+                keepalive_expiry=30
+            )
+        )
+
+async def shutdown():
+    """
+    Closes the shared AsyncClient. Called when the app shuts down.
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Returns the shared AsyncClient.
+
+    Raises:
+        RuntimeError: If the client has not been started yet.
+    """
+    if _client is None:
+        raise RuntimeError("HTTP client is not initialized. Was the app lifespan started?")
+    return _client
@@ -0,0 +1,28 @@
+"""Application settings loaded from the environment and the .env file."""
+from functools import lru_cache
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+class Settings(BaseSettings):
+    # The API keys stay optional so the app can start without them; the
+    # services and the health check report a missing key instead.
+    GEMINI_API_KEY: Optional[str] = None
+    ELEVENLABS_API_KEY: Optional[str] = None
+    ELEVENLABS_MODEL_ID: str = "eleven_multilingual_v2"
+    # In-flight ElevenLabs requests per worker process; with several workers
+    # the total is workers x TTS_CONCURRENCY.
+    TTS_CONCURRENCY: int = 8
+    # Adjacent lines by the same speaker are merged into one TTS request up
+    # to this many characters, well below ElevenLabs' per-request limit.
+    # 0 disables merging, which lets more short lines hit the TTS cache.
+    TTS_MERGE_MAX_CHARS: int = 1000
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Returns the application settings, read once on first use.
+    """
+    return Settings()
@@ -0,0 +1,24 @@
+"""Chunked Base64 encoding of files."""
+from typing import BinaryIO, Iterator
+
+import pybase64
+
+# A multiple of 3, so no padding appears mid-stream.
+B64_CHUNK_SIZE = 3 * 65536
+
+def iter_base64(f: BinaryIO) -> Iterator[bytes]:
+    """
+    Yields the Base64 encoding of a binary file, one chunk at a time.
+    """
+    while True:
+        b = f.read(B64_CHUNK_SIZE)
+        if not b:
+            break
+        yield pybase64.b64encode(b)
+
+def encode_file_base64(path: str) -> str:
+    """
+    Returns the Base64 encoding of a file as a string.
+    """
+    with open(path, "rb") as f:
+        return b"".join(iter_base64(f)).decode("ascii")
@@ -0,0 +1,91 @@
+"""StaticFiles with long-lived caching and on-demand Base64 copies."""
+import asyncio
+import os
+import stat
+import tempfile
+
+import anyio.to_thread
+from starlette.exceptions import HTTPException
+from starlette.staticfiles import StaticFiles
+
+from .base64_files import iter_base64
+
+B64_SUFFIX = ".b64"
+PARTIAL_SUFFIX = ".part"
+# Generated files have unique names and never change once written.
+CACHE_CONTROL = "public, max-age=604800, immutable"
+
+def write_base64_file(source_path: str, output_path: str):
+    """
+    Base64-encodes a file into another file, reading it in chunks.
+    The data goes to a uniquely named temporary file that is renamed into
+    place, so concurrent writers never share or remove each other's file.
+    """
+    fd, partial_path = tempfile.mkstemp(
+        dir=os.path.dirname(output_path),
+        prefix=f"{os.path.basename(output_path)}.",
+        suffix=PARTIAL_SUFFIX
+    )
+    try:
+        with open(source_path, "rb") as src, os.fdopen(fd, "wb") as out:
+            for chunk in iter_base64(src):
+                out.write(chunk)
+        os.replace(partial_path, output_path)
+    except BaseException:
+        try:
+            os.remove(partial_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+class CachedStaticFiles(StaticFiles):
+    """
+    Serves files with a Cache-Control header on top of Starlette's ETag and
+    If-None-Match handling, and hides `*.part` files that are still being
+    written. A request for `<name>.b64` returns the Base64 encoding of
+    `<name>`, generated on first use and kept on disk.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._b64_locks: dict[str, asyncio.Lock] = {}
+
+    async def get_response(self, path, scope):
+        if path.endswith(PARTIAL_SUFFIX):
+            # Files still being written are never served.
+            raise HTTPException(status_code=404)
+        if path.endswith(B64_SUFFIX):
+            await self._ensure_base64_copy(path)
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = CACHE_CONTROL
+        if str(full_path).endswith(B64_SUFFIX):
+            response.headers["Content-Type"] = "text/plain; charset=ascii"
+        return response
+
+    async def _ensure_base64_copy(self, path: str):
+        _, b64_stat = await anyio.to_thread.run_sync(self.lookup_path, path)
+        if b64_stat is not None:
+            return
+
+        source = path[:-len(B64_SUFFIX)]
+        if source.endswith((PARTIAL_SUFFIX, B64_SUFFIX)):
+            # Still being written, or already an encoding: `x.b64.b64...`
+            # would otherwise grow by 4/3 with every request.
+            return
+        source_path, source_stat = await anyio.to_thread.run_sync(self.lookup_path, source)
+        if source_stat is None or not stat.S_ISREG(source_stat.st_mode):
+            return
+
+        # Concurrent first requests for the same file wait for one encoder.
+        lock = self._b64_locks.setdefault(path, asyncio.Lock())
+        try:
+            async with lock:
+                _, b64_stat = await anyio.to_thread.run_sync(self.lookup_path, path)
+                if b64_stat is None:
+                    await anyio.to_thread.run_sync(write_base64_file, source_path, f"{source_path}{B64_SUFFIX}")
+        finally:
+            if not lock.locked() and self._b64_locks.get(path) is lock:
+                del self._b64_locks[path]
@@ -0,0 +1,16 @@
+"""Gunicorn configuration for running the app with Uvicorn workers.
+
+Usage:
+    gunicorn app.main:app -c gunicorn_conf.py
+"""
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+# The app is I/O-bound and every worker runs its own event loop, so one
+# worker per CPU is enough. Per-process limits such as TTS_CONCURRENCY
+# apply to each worker, so the deployment total is workers x limit.
+workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+# Uvicorn picks uvloop and httptools automatically when they are installed.
+worker_class = "uvicorn.workers.UvicornWorker"
+# Generating a long podcast can take minutes.
+timeout = 300